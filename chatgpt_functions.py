@@ -1,13 +1,33 @@
-import datetime, json, os           # core python libraries
+import asyncio                      # off-loop tool dispatch
+import datetime, os, hashlib        # core python libraries
+import threading                    # locks for caches shared across worker threads
+import orjson                       # fast C JSON on the tool-call path
 import openai                       # chatGPT API
+from cachetools import TTLCache, cached     # bounded caches with expiry
 from dotenv import load_dotenv      # load .env
-import pytz                         # timezones
+from zoneinfo import ZoneInfo       # timezones (cached, faster than pytz)
 import requests                     # http queries
+import tenacity                     # retry with backoff
 import tweepy                       # twitter API
 
 load_dotenv()
 
-client = openai.OpenAI(api_key=os.getenv('CHAT_API_KEY'))
+# async client for chat and image calls; reuses one pooled httpx connection so
+# the event loop keeps serving other commands during LLM round-trips
+aclient = openai.AsyncOpenAI(api_key=os.getenv('CHAT_API_KEY'))
+
+# pooled HTTP session so the RapidAPI tool calls reuse one TCP+TLS connection
+# instead of paying a fresh handshake on every lookup; per-call headers merge
+# with these, so only the host header varies by endpoint
+_http = requests.Session()
+_http.headers.update({"X-RapidAPI-Key": "d66e36c641msh71bd179143810dep11f9f8jsn691562db2764"})
+
+# endpoint constants built once instead of per tool call
+WEATHER_URL = "https://weatherapi-com.p.rapidapi.com/current.json"
+WEATHER_HEADERS = {"X-RapidAPI-Host": "weatherapi-com.p.rapidapi.com"}
+MINECRAFT_URL = "https://minecraft-server-status1.p.rapidapi.com/servers/single/lite"
+MINECRAFT_HEADERS = {"content-type": "application/json",
+                     "X-RapidAPI-Host": "minecraft-server-status1.p.rapidapi.com"}
 
 twitter = tweepy.Client(consumer_key=os.getenv('TWITTER_API_KEY'),
                         consumer_secret=os.getenv('TWITTER_API_KEY_SECRET'),
@@ -15,7 +35,32 @@ twitter = tweepy.Client(consumer_key=os.getenv('TWITTER_API_KEY'),
                         access_token_secret=os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
                         )
 
-def call_chatGPT(chat_history, prompt):
+# exact-match response cache: a re-sent prompt within the hour skips the API
+# round-trip (and its token cost) entirely; function-call turns are never
+# cached since their answers depend on live data
+_response_cache = TTLCache(maxsize=1024, ttl=3600)
+
+def _response_cache_key(model, system_prompt, last_turn, prompt):
+    # normalize the prompt for the key only (the API still sees it verbatim)
+    # so trivial case/whitespace variants share a cache entry; last_turn scopes
+    # the key to the conversation position, so context-dependent follow-ups
+    # ("why?", "yes") can't be answered from a different conversation
+    raw = orjson.dumps([model, system_prompt, last_turn, prompt.strip().lower()])
+    return hashlib.sha256(raw).hexdigest()
+
+
+# retry transient OpenAI failures (rate limits, dropped connections) with
+# jittered backoff instead of bubbling an error message the user must re-send
+@tenacity.retry(wait=tenacity.wait_random_exponential(min=1, max=20),
+                stop=tenacity.stop_after_attempt(3),
+                retry=tenacity.retry_if_exception_type((openai.RateLimitError,
+                                                        openai.APIConnectionError)),
+                reraise=True)
+async def _create_completion(**kwargs):
+    return await aclient.chat.completions.create(**kwargs)
+
+
+async def call_chatGPT(chat_history, prompt):
     """Call ChatGPT API with error handling blocks.
     
     This function interacts with the ChatGPT API to generate responses based on the given chat history
@@ -35,90 +80,111 @@ def call_chatGPT(chat_history, prompt):
     """
     
     try:
-        # Append the user prompt to the chat history
-        append_and_shift(chat_history, {"role": "user", "content": prompt}, max_len=20)
-        
-        # Send request to the ChatGPT API
         model = "gpt-4o-mini"
         temperature = 0.7
         max_tokens=512
 
-        response = client.chat.completions.create(model=model,
-                                                  temperature=temperature,
-                                                  max_tokens=max_tokens,
-                                                  messages=chat_history,
-                                                  functions=function_descriptions,
-                                                  function_call="auto")
-        
-        # If the response is not a function call, append assistant's response to the chat history
-        if response.choices[0].finish_reason != "function_call":
-            append_and_shift(chat_history, {"role": "assistant", "content": response.choices[0].message.content}, max_len=10)
-        
-        # If there was a function call, append it to the message history and run the response again
-        while response.choices[0].finish_reason == "function_call":
-            function_response = function_call(response)
-            append_and_shift(chat_history, {"role": "function", "name": response.choices[0].message.function_call.name, "content": json.dumps(function_response)}, max_len=10)
-            response = client.chat.completions.create(model=model,
-                                                      temperature=temperature,
-                                                      max_tokens=max_tokens,
-                                                      messages=chat_history,
-                                                      functions=function_descriptions,
-                                                      function_call="auto")
-        
+        # serve identical prompts straight from the cache (keyed by the most
+        # recent turn, which is the system prompt when the history is fresh)
+        cache_key = _response_cache_key(model, chat_history[0]["content"],
+                                        chat_history[-1]["content"], prompt)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            chat_history.append({"role": "user", "content": prompt})
+            chat_history.append({"role": "assistant", "content": cached})
+            return chat_history, cached
+
+        # Append the user prompt to the chat history (the caller's deque
+        # bounds the rolling window, so no manual shifting is needed)
+        chat_history.append({"role": "user", "content": prompt})
+
+        response = await _create_completion(model=model,
+                                             temperature=temperature,
+                                             max_tokens=max_tokens,
+                                             messages=chat_history,
+                                             tools=TOOL_SCHEMAS,
+                                             tool_choice="auto")
+
+        # bind the choice once per response instead of re-indexing the chain
+        choice = response.choices[0]
+
+        # If the model asked for tools, run them all concurrently, feed the
+        # results back, and let it phrase the final answer. The tool exchange
+        # happens on a scratch copy of the messages so the rolling history
+        # never holds an orphaned tool message after the deque trims
+        used_tools = bool(choice.message.tool_calls)
+        messages = chat_history
+        while choice.message.tool_calls:
+            tool_calls = choice.message.tool_calls
+            messages = [*messages,
+                        {"role": "assistant", "content": choice.message.content,
+                         "tool_calls": [{"id": tc.id, "type": "function",
+                                         "function": {"name": tc.function.name,
+                                                      "arguments": tc.function.arguments}}
+                                        for tc in tool_calls]}]
+            # tool bodies are blocking HTTP calls, so run them off the event
+            # loop — and in parallel when the model emits several at once
+            results = await asyncio.gather(
+                *(asyncio.to_thread(function_call, tc) for tc in tool_calls))
+            for tc, result in zip(tool_calls, results):
+                messages.append({"role": "tool", "tool_call_id": tc.id,
+                                 "content": orjson.dumps(result).decode()})
+            # the follow-up turn only summarizes the tool results, so skip
+            # re-sending the tool schemas and their prompt tokens
+            response = await _create_completion(model=model,
+                                                 temperature=temperature,
+                                                 max_tokens=max_tokens,
+                                                 messages=messages)
+            choice = response.choices[0]
+
+        chat_history.append({"role": "assistant", "content": choice.message.content})
+
         # Return the updated chat history and the generated response content (limited to 2000 characters)
-        return chat_history, response.choices[0].message.content[:2000]
+        content = choice.message.content[:2000]
+        if not used_tools:
+            _response_cache[cache_key] = content
+        return chat_history, content
     
     except Exception as e:
         # Handle any exceptions by returning an error message
         return chat_history, f'Looks like there was an error: {repr(e)}'
 
     
-def function_call(ai_response):
-    """Process the function call in the AI response and invoke the corresponding function.
-    
-    This function extracts the function call details from the AI response and invokes the appropriate
-    function based on the function name. The function call typically includes the function name and its
-    corresponding arguments. The supported functions in this implementation are:
+def function_call(tool_call):
+    """Process a tool call from the AI response and invoke the corresponding function.
+
+    This function extracts the name and arguments from a single tool call and invokes the
+    appropriate function through the dispatch table. The supported functions in this
+    implementation are:
     - get_todays_date: Retrieves today's date based on the provided timezone.
     - get_current_weather: Retrieves the current weather based on the provided location.
     - get_minecraft_server: Retrieves information about a Minecraft server based on the provided IP address.
-    
+
     Args:
-        ai_response (json): The AI response containing the function call details.
-    
+        tool_call: One entry of the AI response's message.tool_calls.
+
     Returns:
         The result of the invoked function (must be json) or None if the function name is not supported.
     """
-    
-    # Extract function call details from the AI response
-    function_call = ai_response.choices[0].message.function_call
-    function_name = function_call.name
-    arguments = function_call.arguments
-    
-    # Process the function call based on the function name
-    if function_name == "get_todays_date":
-        # Extract the timezone argument and invoke the get_todays_date function
-        timezone = eval(arguments).get("timezone")
-        return get_todays_date(timezone)
-    elif function_name == "get_current_weather":
-        # Extract the location argument and invoke the get_current_weather function
-        location = eval(arguments).get("location")
-        return get_current_weather(location)
-    elif function_name == "get_minecraft_server":
-        # Extract the IP address argument and invoke the get_minecraft_server function
-        ip_address = eval(arguments).get("ip_address")
-        return get_minecraft_server(ip_address)
-    elif function_name == "post_tweet":
-        # Extract the tweet message argument and invoke post_tweet function
-         message = eval(arguments).get("message")
-         return post_tweet(message)
-    else:
-        # If the function name is not supported, return None
+
+    # Extract function call details from the tool call
+    function_name = tool_call.function.name
+    # arguments is a JSON string, so parse it once with orjson.loads instead of
+    # eval (which compiles and runs the model's output as python code)
+    arguments = orjson.loads(tool_call.function.arguments)
+
+    # look the tool up in the dispatch table; unknown names return None
+    tool = _TOOLS.get(function_name)
+    if tool is None:
         return None
+    func, arg_name = tool
+    return func(arguments.get(arg_name))
 
 
 # .json of all functions & arguments with descriptions so the model can intelligently decide when and how to invoke
-function_descriptions = [
+# built once at import as an immutable tuple; every create() call passes this
+# same object, so the SDK never sees a freshly-built schema list
+function_descriptions = (
     {
         "name": "get_todays_date",
         "description": "Get todays date, returned as a string in format of yyyy-mm-dd hh:mm:ss",
@@ -173,26 +239,36 @@ function_descriptions = [
             "required": ["message"],
         },
     }
-]
+)
+
+# the same schemas wrapped in the envelope the tools= API expects, built once;
+# with tools= the model can emit several calls in one response instead of one
+# round-trip per tool
+TOOL_SCHEMAS = tuple({"type": "function", "function": fd} for fd in function_descriptions)
 
 def get_todays_date(timezone='US/Eastern'):
     """Get the current date and time based on the timezone"""
-    tz = pytz.timezone(timezone)
+    # ZoneInfo caches constructed zones process-wide, so repeat calls for the
+    # same timezone skip the tzdata file read pytz paid every time
+    tz = ZoneInfo(timezone)
     today = {
         "timezone": timezone,
         "today": str(datetime.datetime.now(tz))
     }
-    return json.dumps(today)
+    return orjson.dumps(today).decode()
 
 
+# weather barely moves inside five minutes, so repeat lookups for the same
+# location skip the RapidAPI round-trip entirely; the lock matters because
+# parallel tool calls hit this cache from separate worker threads
+@cached(TTLCache(maxsize=256, ttl=300),
+        key=lambda location, unit="fahrenheit": (location.strip().lower(), unit),
+        lock=threading.Lock())
 def get_current_weather(location, unit="fahrenheit"):
     """Get the current weather in a given location"""
 
-    url = "https://weatherapi-com.p.rapidapi.com/current.json"
-    querystring = {"q":location}
-    headers = {"X-RapidAPI-Key": "d66e36c641msh71bd179143810dep11f9f8jsn691562db2764",
-               "X-RapidAPI-Host": "weatherapi-com.p.rapidapi.com"}
-    response = requests.get(url, headers=headers, params=querystring).json()
+    # decode the raw bytes with orjson instead of the requests/stdlib parser
+    response = orjson.loads(_http.get(WEATHER_URL, headers=WEATHER_HEADERS, params={"q":location}).content)
 
     weather = {"location":response.get("location"),
                "unit":unit,
@@ -203,22 +279,14 @@ def get_current_weather(location, unit="fahrenheit"):
                "precip_inches":response.get("current").get("precip_in")
     }
 
-    return json.dumps(weather)
+    return orjson.dumps(weather).decode()
 
+# short TTL: player counts change fast, but back-to-back asks can share a result
+@cached(TTLCache(maxsize=32, ttl=30), lock=threading.Lock())
 def get_minecraft_server(ip_address='51.81.151.253:25583'):
     """Get the server details based on the IP address """
    
-    url = "https://minecraft-server-status1.p.rapidapi.com/servers/single/lite"
-
-    payload = { "host": ip_address }
-    headers = {
-        "content-type": "application/json",
-        "X-RapidAPI-Key": "d66e36c641msh71bd179143810dep11f9f8jsn691562db2764",
-        "X-RapidAPI-Host": "minecraft-server-status1.p.rapidapi.com"
-    }
-
-    response = requests.post(url, json=payload, headers=headers)
-    print(response.json)
+    response = _http.post(MINECRAFT_URL, json={"host": ip_address}, headers=MINECRAFT_HEADERS)
 
     return response.json()
 
@@ -233,14 +301,27 @@ def post_tweet(message):
             "Tweet_URL": tweet_url,
             "Tweet_Status": "Complete"
         }  # Create a JSON-ready dictionary with tweet info
-        return json.dumps(tweet_json)  # Convert and return as JSON
+        return orjson.dumps(tweet_json).decode()  # Convert and return as JSON
 
     except Exception as e:
         exception_json = {"Error": repr(e)}  # Create an exception JSON
-        return json.dumps(exception_json)  # Convert and return as JSON
+        return orjson.dumps(exception_json).decode()  # Convert and return as JSON
 # Assumes 'twitter' object and 'json' module are defined elsewhere
 
-def call_dalle3(prompt):
+# name -> (callable, argument key) dispatch table for function_call; adding a
+# tool means one entry here plus its schema in function_descriptions
+_TOOLS = {
+    "get_todays_date": (get_todays_date, "timezone"),
+    "get_current_weather": (get_current_weather, "location"),
+    "get_minecraft_server": (get_minecraft_server, "ip_address"),
+    "post_tweet": (post_tweet, "message"),
+}
+
+# in-flight DALL-E requests by normalized prompt; duplicates arriving during
+# the ~15s generation window await the same result instead of paying twice
+_dalle_inflight = {}
+
+async def call_dalle3(prompt):
     """
     Generate an image using the DALL-E 3 model based on the provided prompt.
 
@@ -251,30 +332,42 @@ def call_dalle3(prompt):
         str: The URL of the generated image.
              If an error occurs during the API request, an error message is returned.
     """
-    try:        
+    # coalesce with any identical request already in flight
+    key = prompt.strip().lower()
+    pending = _dalle_inflight.get(key)
+    if pending is not None:
+        return await pending
+
+    future = asyncio.get_running_loop().create_future()
+    _dalle_inflight[key] = future
+    result = None
+    try:
         # Send a request to the ChatGPT API using the OpenAI library
-        response = client.images.generate(model="dall-e-3",  # Specify the DALL-E 3 model
-                                          prompt=prompt,     # Provide the prompt for image generation
-                                          size="1024x1024")  # Specify the size of the generated image
-        
+        response = await aclient.images.generate(model="dall-e-3",  # Specify the DALL-E 3 model
+                                                 prompt=prompt,     # Provide the prompt for image generation
+                                                 size="1024x1024")  # Specify the size of the generated image
+
         # Return the URL of the generated image from the API response
-        return response.data[0].url
-        
+        result = response.data[0].url
+
     except Exception as e:
         # Handle any exceptions that may occur during the API request
-        return f'Looks like there was an error: {repr(e)}'
+        result = f'Looks like there was an error: {repr(e)}'
 
+    finally:
+        del _dalle_inflight[key]
+        # resolve the future here: cancellation skips the except above, and
+        # coalesced waiters must never be left hanging on an abandoned future
+        if result is not None:
+            future.set_result(result)
+        else:
+            future.cancel()
+
+    return result
 
-def append_and_shift(arr, v, max_len):
-    """
-    Append a value (v) to an array (arr) up to a set maximum length (max_len).
-    If the maximum length is reached, shift out the second earliest registry.
-    """
-    arr.append(v)
-    if len(arr) > max_len:
-        arr.pop(1)
 
-# whitelist of users who can use ChatGPT
-IDCARD = ['162725160397438978','94235023560941568','95321829031280640','94254577766891520','250729999349317632','186667084007211008']
+# whitelist of users who can use ChatGPT (frozenset of ints for O(1) checks
+# against ctx.author.id without a str() conversion per call)
+IDCARD = frozenset({162725160397438978,94235023560941568,95321829031280640,94254577766891520,250729999349317632,186667084007211008})
 # whitelist of users who can use Dalle-3
-DALLE3_WHITELIST = ['162725160397438978','250729999349317632','186667084007211008']
\ No newline at end of file
+DALLE3_WHITELIST = frozenset({162725160397438978,250729999349317632,186667084007211008})
\ No newline at end of file
@@ -0,0 +1,263 @@
+# ====================================================================================
+# Function definitions for reading, writing, and manipulating the data in SQL database
+# ====================================================================================
+
+import os,time,threading                                    # Core python libraries
+import pymysql                                              # Connect to AWS SQL
+from dbutils.pooled_db import PooledDB                      # Pool SQL connections
+import pandas as pd                                         # Manipulate tabular data
+from dotenv import load_dotenv                              # Load .env
+
+load_dotenv()
+
+# process-wide connection pool, created once at startup so commands don't pay
+# a fresh TCP+auth handshake on every query (conn.close() returns to the pool)
+POOL = PooledDB(creator=pymysql,
+                mincached=2,
+                maxcached=10,
+                maxconnections=25,
+                host=os.getenv('SQL_HOST'),
+                user=os.getenv('SQL_USER'),
+                password=os.getenv('SQL_PASSWORD'),
+                database=os.getenv('SQL_DATABASE'))
+
+def connect_db():
+    # check out a pooled connection to the database
+    conn = POOL.connection()
+    cursor = conn.cursor()
+    return conn,cursor
+
+def write_to_db(table_name, user_id, prompt=None):
+    # write to server and close connection
+    global _firstlist_cache
+    if table_name == 'firstlist_id':
+        _firstlist_cache = None     # force a refetch on the next read
+        _leaderboard_cache.clear()  # stale boards would hide the new first
+    conn,cursor = connect_db()
+    # constant statement text per table, no per-call string formatting
+    # mainly used for first table
+    if prompt == None:
+        vals = [user_id]
+        query = INSERT_FIRST
+    # mainly used for dalle3 table
+    else:
+        vals = [user_id,prompt]
+        query = INSERT_DALLE_PROMPT
+    cursor.execute(query,vals)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+# hot-path insert kept as a module constant so every execute reuses the
+# exact same statement text (and pymysql's escape/rewrite cache of it)
+INSERT_MESSAGES = """INSERT INTO messages (id,member_id,channel_id,content,created_at)
+                VALUES
+                    (%s, %s, %s, %s, %s)"""
+
+INSERT_DALLE_PROMPT = "INSERT INTO dalle_3_prompts (user_id, prompt) VALUES (%s, %s)"
+
+INSERT_FIRST = "INSERT INTO firstlist_id (user_id) VALUES (%s)"
+
+def flush_writes(batch):
+    # group queued (statement, row) pairs and write each group in one executemany
+    groups = {}
+    for query,vals in batch:
+        groups.setdefault(query, []).append(vals)
+    conn,cursor = connect_db()
+    with cursor:
+        for query,rows in groups.items():
+            cursor.executemany(query, rows)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+def update_sql_members(vals):
+    conn,cursor = connect_db()
+    with cursor:
+        query="""INSERT INTO members (id, user_name, display_name, avatar, created_at)
+                VALUES
+                    (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    user_name = VALUES(user_name),
+                    display_name = VALUES(display_name),
+                    avatar = VALUES(avatar),
+                    created_at = VALUES(created_at);"""
+
+        cursor.executemany(query, vals)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+def update_sql_emojis(vals):
+    conn,cursor = connect_db()
+    with cursor:
+        query="""INSERT INTO emojis (id, emoji_name, guild_id, url, created_at)
+                VALUES
+                    (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    emoji_name = VALUES(emoji_name),
+                    guild_id = VALUES(guild_id),
+                    url = VALUES(url),
+                    created_at = VALUES(created_at);"""
+
+        cursor.executemany(query, vals)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+def update_sql_channels(vals):
+    conn,cursor = connect_db()
+    with cursor:
+        query="""INSERT INTO channels (id, channel_name, created_at)
+                VALUES
+                    (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    channel_name = VALUES(channel_name),
+                    created_at = VALUES(created_at);"""
+
+        cursor.executemany(query, vals)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+def get_db(table_name, cols=None):
+    # get table as pandas df and close connection, skipping the pandas
+    # read_sql_query wrapper (and its SQLAlchemy warning) for a plain fetch;
+    # pass cols to project only the columns a caller actually needs
+    conn,cursor = connect_db()
+    cursor.execute(f"SELECT {','.join(cols) if cols else '*'} FROM {table_name}")
+    rows = cursor.fetchall()
+    columns = [d[0] for d in cursor.description]
+    cursor.close()
+    conn.close()
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    # pymysql hands back python datetimes; cast once so .dt accessors work
+    if 'timesent' in df.columns:
+        df['timesent'] = pd.to_datetime(df['timesent'])
+    return df
+
+# computed leaderboard payloads for _score/_juice, rebuilt at most every
+# LEADERBOARD_TTL seconds and cleared whenever a new first lands
+LEADERBOARD_TTL = 300
+_leaderboard_cache = {}
+
+def cached_leaderboard(name, builder):
+    # return the cached payload for name, calling builder() only on miss/expiry
+    entry = _leaderboard_cache.get(name)
+    if entry is None or time.time() - entry[0] > LEADERBOARD_TTL:
+        entry = (time.time(), builder())
+        _leaderboard_cache[name] = entry
+    return entry[1]
+
+# firstlist_id changes at most once a day, so commands share a cached copy
+# instead of refetching the whole table on every invocation
+FIRSTLIST_TTL = 300     # seconds before the cache refetches anyway
+_firstlist_cache = None
+_firstlist_lock = threading.Lock()  # readers run in worker threads
+
+def get_firstlist():
+    # cached firstlist_id table, invalidated on write and refreshed on TTL expiry;
+    # the lock keeps concurrent commands from refetching the table in parallel
+    global _firstlist_cache
+    with _firstlist_lock:
+        if _firstlist_cache is None or time.time() - _firstlist_cache[0] > FIRSTLIST_TTL:
+            _firstlist_cache = (time.time(), get_db('firstlist_id', cols=['user_id','timesent']))
+        # return a copy so the helpers can add columns without corrupting the cache
+        return _firstlist_cache[1].copy()
+
+def get_first_counts(n=5):
+    # top-n win counts aggregated in SQL instead of pulling the whole table
+    conn,cursor = connect_db()
+    query = """SELECT user_id, COUNT(*) AS c FROM firstlist_id
+               GROUP BY user_id ORDER BY c DESC LIMIT %s"""
+    cursor.execute(query, [n])
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+def get_last_first():
+    # most recent first claim as (user_id, timesent)
+    conn,cursor = connect_db()
+    cursor.execute('SELECT user_id, timesent FROM firstlist_id ORDER BY timesent DESC LIMIT 1')
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row
+
+def get_streak():
+    # length of the current run of wins, counted in SQL
+    conn,cursor = connect_db()
+    query = """SELECT COUNT(*) FROM firstlist_id
+               WHERE timesent > (SELECT COALESCE(MAX(timesent), '1970-01-01') FROM firstlist_id
+                                 WHERE user_id <> (SELECT user_id FROM firstlist_id
+                                                   ORDER BY timesent DESC LIMIT 1))"""
+    cursor.execute(query)
+    (streak,) = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return streak
+
+def get_user_streak(user_id):
+    # longest run of wins for a single user, found with a gaps-and-islands
+    # window query instead of materializing streak columns over the whole table
+    conn,cursor = connect_db()
+    query = """SELECT MAX(run_len) FROM (
+                   SELECT COUNT(*) AS run_len FROM (
+                       SELECT user_id,
+                              ROW_NUMBER() OVER (ORDER BY timesent)
+                            - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY timesent) AS grp
+                       FROM firstlist_id) t
+                   WHERE user_id = %s GROUP BY grp) r"""
+    cursor.execute(query, [user_id])
+    (user_streak,) = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return user_streak
+
+# minutes past midnight EST, computed server-side for the juice queries
+JUICE_MINUTES_SQL = """HOUR(CONVERT_TZ(timesent,'UTC','US/Eastern'))*60
+                     + MINUTE(CONVERT_TZ(timesent,'UTC','US/Eastern'))
+                     + SECOND(CONVERT_TZ(timesent,'UTC','US/Eastern'))/60"""
+
+def get_top_juice(n=5):
+    # top-n juice totals aggregated in SQL instead of pandas groupby
+    conn,cursor = connect_db()
+    query = f"""SELECT user_id, SUM({JUICE_MINUTES_SQL}) AS juice
+                FROM firstlist_id GROUP BY user_id ORDER BY juice DESC LIMIT %s"""
+    cursor.execute(query, [n])
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+def get_juice_highscore():
+    # biggest single-day juice value and who got it
+    conn,cursor = connect_db()
+    query = f"""SELECT user_id, {JUICE_MINUTES_SQL} AS juice
+                FROM firstlist_id ORDER BY juice DESC LIMIT 1"""
+    cursor.execute(query)
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row
+
+def get_user_juice(user_id):
+    # juice total for a single user, summed where the index on user_id lives
+    # instead of pulling the whole table into pandas
+    conn,cursor = connect_db()
+    query = f"""SELECT SUM({JUICE_MINUTES_SQL}) FROM firstlist_id WHERE user_id = %s"""
+    cursor.execute(query, [user_id])
+    (user_juice,) = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return user_juice
+
+def get_user_score(user_id):
+    # count of wins for a single user, pushed down to SQL
+    conn,cursor = connect_db()
+    cursor.execute('SELECT COUNT(*) FROM firstlist_id WHERE user_id = %s', [user_id])
+    (user_score,) = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return user_score
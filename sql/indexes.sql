@@ -0,0 +1,8 @@
+-- One-time index migration for the AWS RDS database.
+-- The bot's queries filter firstlist_id by user_id and order by timesent,
+-- and the dashboard aggregates messages by member; without these indexes
+-- every one of those queries is a full table scan.
+
+CREATE INDEX ix_first_user ON firstlist_id (user_id);
+CREATE INDEX ix_first_ts ON firstlist_id (timesent);
+CREATE INDEX ix_messages_member ON messages (member_id, created_at);